@@ -8,12 +8,14 @@ https://www.weather.gov/documentation/services-web-api
 ---------------------------------------------------------
 """
 import asyncio
+import functools
 import logging
 import time
+import types
 from datetime import timedelta, datetime, timezone
 
 import aiohttp
-import async_timeout
+import ijson
 import voluptuous as vol
 from homeassistant.components.sensor import PLATFORM_SCHEMA
 from homeassistant.const import (
@@ -24,7 +26,9 @@ from homeassistant.const import (
     ATTR_ATTRIBUTION,
     ATTR_LATITUDE,
     ATTR_LONGITUDE,
+    EVENT_HOMEASSISTANT_STOP,
 )
+from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
 from homeassistant.helpers.entity import Entity
 from homeassistant.util import Throttle
@@ -33,10 +37,21 @@ _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = 'nws_warnings'
 
+DATA_SESSION = 'session'
+DATA_INFLIGHT = 'inflight'
+DATA_CACHE = 'cache'
+DATA_SEVERITIES = 'severities'
+
 NWS_API_ENDPOINT = 'https://api.weather.gov/alerts'
+NWS_API_ACTIVE_ENDPOINT = f'{NWS_API_ENDPOINT}/active'
 
 USER_AGENT = 'Home Assistant'
 
+HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'application/geo+json'
+}
+
 PARAM_POINT = 'point'
 PARAM_START = 'start'
 PARAM_END = 'end'
@@ -44,17 +59,19 @@ PARAM_STATUS = 'status'
 PARAM_MESSAGE_TYPE = 'message_type'
 PARAM_SEVERITY = 'severity'
 
-VALID_MESSAGE_TYPE = [
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+VALID_MESSAGE_TYPE = frozenset((
     'alert',
     'update'
-]
-VALID_SEVERITY = [
+))
+VALID_SEVERITY = frozenset((
     'unknown',
     'minor',
     'moderate',
     'severe',
     'extreme'
-]
+))
 
 CONF_SEVERITY = 'severity'
 CONF_MESSAGE_TYPE = 'message_type'
@@ -78,6 +95,9 @@ ATTR_UPDATES = 'updates'
 
 MIN_TIME_BETWEEN_UPDATES = timedelta(hours=1)
 
+COALESCE_TTL = timedelta(seconds=30).total_seconds()
+CACHE_RETENTION = (MIN_TIME_BETWEEN_UPDATES * 2).total_seconds()
+
 DEFAULT_ICON = 'mdi:alert'
 
 PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
@@ -103,32 +123,134 @@ PLATFORM_SCHEMA = PLATFORM_SCHEMA.extend({
 })
 
 
-def _get_headers():
-    return {
-        'User-Agent': USER_AGENT,
-        'Accept': 'application/geo+json'
-    }
-
-
+@functools.lru_cache(maxsize=16)
 def _get_query_params(severity, message_type, latitude, longitude):
-    return {
+    """Return the shared, read-only query params for a location."""
+    return types.MappingProxyType({
         PARAM_MESSAGE_TYPE: message_type,
         PARAM_SEVERITY: severity,
-        PARAM_POINT: "%s,%s" % (latitude, longitude)
-    }
+        PARAM_POINT: f"{latitude:.4f},{longitude:.4f}"
+    })
+
+
+def _join_severities(registered):
+    """Return the union of the registered severities as a query value."""
+    return ','.join(sorted(frozenset().union(*registered)))
 
 
 def _append_time_params(params, start, end):
     if start and end:
-        params[PARAM_START] = start
-        params[PARAM_END] = end
+        return {**params, PARAM_START: start, PARAM_END: end}
 
     return params
 
 
+@callback
+def _async_get_session(hass):
+    """Return the HTTP session shared by all NWS warnings sensors."""
+    data = hass.data.setdefault(DOMAIN, {
+        DATA_INFLIGHT: {},
+        DATA_CACHE: {},
+        DATA_SEVERITIES: {}
+    })
+    session = data.get(DATA_SESSION)
+    if session is None:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=10, keepalive_timeout=75),
+            timeout=aiohttp.ClientTimeout(total=10, connect=5, sock_read=8),
+            headers=HEADERS
+        )
+        data[DATA_SESSION] = session
+
+        async def _async_close_session(_event):
+            await session.close()
+
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP,
+                                   _async_close_session)
+    return session
+
+
+async def _async_request_alerts(session, url, params, etag=None):
+    """Request alerts from the NWS api, returning the ETag and alerts.
+
+    Alerts are (sent, headline, severity) tuples, or None when the alerts
+    are unchanged (304) or on error.
+    """
+    _LOGGER.debug("Retrieving alerts from %s with %s",
+                  url,
+                  params)
+    headers = {'If-None-Match': etag} if etag else None
+    async with session.get(url, params=params, headers=headers) as response:
+
+        if response.status == 304:
+            return etag, None
+
+        if response.status != 200:
+            _LOGGER.warning("Error %d getting nws alerts.", response.status)
+            return None, None
+
+        alerts = []
+        async for properties in ijson.items_async(response.content,
+                                                  'features.item.properties'):
+            if not isinstance(properties, dict):
+                continue
+            sent = properties.get('sent')
+            update = properties.get('headline')
+            if sent and update:
+                alerts.append((sent, update, (properties.get('severity') or '').lower()))
+
+        return response.headers.get('ETag'), alerts
+
+
+async def _async_refresh_alerts(data, session, url, params, key):
+    """Refresh the cached alerts for a query."""
+    cached = data[DATA_CACHE].get(key)
+    try:
+        etag, alerts = await _async_request_alerts(
+            session, url, params, cached[1] if cached else None)
+    finally:
+        data[DATA_INFLIGHT].pop(key, None)
+
+    if alerts is None:
+        if not etag or not cached:
+            return None
+        alerts = cached[2]
+
+    now = time.monotonic()
+    cache = data[DATA_CACHE]
+    for stale in [stale for stale, entry in cache.items()
+                  if now - entry[0] > CACHE_RETENTION]:
+        del cache[stale]
+    cache[key] = (now, etag, alerts)
+    return alerts
+
+
+async def _async_fetch_alerts(hass, session, url, params):
+    """Return alerts for a query, sharing requests between sensors.
+
+    Results are reused for COALESCE_TTL; older entries only keep their
+    ETag for revalidation and are dropped after CACHE_RETENTION.
+
+    Sensors sharing a query request the union of their severities and
+    filter the result themselves, so they share a single request.
+    """
+    data = hass.data[DOMAIN]
+    key = (url, tuple(sorted(params.items())))
+    cached = data[DATA_CACHE].get(key)
+    if cached and time.monotonic() - cached[0] < COALESCE_TTL:
+        return cached[2]
+
+    task = data[DATA_INFLIGHT].get(key)
+    if task is None:
+        task = hass.async_create_task(
+            _async_refresh_alerts(data, session, url, params, key))
+        data[DATA_INFLIGHT][key] = task
+    return await asyncio.shield(task)
+
+
 async def async_setup_platform(hass, config, add_entities, discovery_info=None):
     """Setup the NWS sensor platform."""
-    sensor = NWSWarningsEntity(hass, config)
+    sensor = NWSWarningsEntity(hass, config, _async_get_session(hass))
     add_entities([sensor])
     return True
 
@@ -137,18 +259,33 @@ async def async_setup_platform(hass, config, add_entities, discovery_info=None):
 class NWSWarningsEntity(Entity):
     """Sensor entity for NWS warnings"""
 
-    def __init__(self, hass, config):
+    def __init__(self, hass, config, websession):
         self._hass = hass
+        self._websession = websession
         self._name = config[CONF_NAME]
         self._icon = config[CONF_ICON]
-        self._severity = ','.join(config[CONF_SEVERITY])
+        self._severity = frozenset(config[CONF_SEVERITY])
         self._message_type = ','.join(config[CONF_MESSAGE_TYPE])
         self._zone = config.get(CONF_ZONE, None)
         self._location = config.get(CONF_LOCATION, None)
         self._forecast_days = config.get(CONF_FORECAST_DAYS, None)
+        if self._location:
+            coords = (self._location[CONF_LATITUDE], self._location[CONF_LONGITUDE])
+            self._get_coords = lambda: coords
+        elif self._zone:
+            coords = self._zone
+            self._get_coords = self._get_zone_lat_long
+        else:
+            coords = None
+            self._get_coords = lambda: (None, None)
+        self._query_id = (coords, self._message_type, self._forecast_days)
+        self._query_severity = _join_severities((self._severity,))
         self._active_only = not self._forecast_days
+        self._url = NWS_API_ACTIVE_ENDPOINT if self._active_only else NWS_API_ENDPOINT
+        self._time_range_day = None
+        self._time_range = None
         self._state = ''
-        self._updates = []
+        self._updates = {}
 
     @property
     def name(self):
@@ -173,93 +310,84 @@ class NWSWarningsEntity(Entity):
             ATTR_ATTRIBUTION: "Data provided by NWS"
         }
 
+    async def async_added_to_hass(self):
+        """Register this sensor's severities for its shared query."""
+        severities = self._hass.data[DOMAIN][DATA_SEVERITIES]
+        registered = severities.get(self._query_id, ((), None))[0] + (self._severity,)
+        severities[self._query_id] = (registered, _join_severities(registered))
+
+    async def async_will_remove_from_hass(self):
+        """Unregister this sensor's severities from its shared query."""
+        severities = self._hass.data[DOMAIN][DATA_SEVERITIES]
+        registered = list(severities.get(self._query_id, ((), None))[0])
+        if self._severity in registered:
+            registered.remove(self._severity)
+        if registered:
+            registered = tuple(registered)
+            severities[self._query_id] = (registered, _join_severities(registered))
+        else:
+            severities.pop(self._query_id, None)
+
     def _get_zone_lat_long(self):
         zone = self._hass.states.get(self._zone)
         if not zone:
             _LOGGER.error("Unable to retrieve zone %s",
                           self._zone)
-            return [None, None]
+            return None, None
 
         latitude = zone.attributes.get(ATTR_LATITUDE, None)
         longitude = zone.attributes.get(ATTR_LONGITUDE, None)
         if not latitude or not longitude:
             _LOGGER.error("Unable to retrieve latitude and longitude from %s",
                           self._zone)
-            return [None, None]
-        return [latitude, longitude]
+            return None, None
+        return latitude, longitude
+
+    def _get_time_range(self):
+        """Return the start and end of the forecast window, cached per day."""
+        now = datetime.now(timezone.utc)
+        if now.date() != self._time_range_day:
+            midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            start = midnight - timedelta(days=1)
+            end = midnight + timedelta(days=self._forecast_days + 2)
+            self._time_range_day = now.date()
+            self._time_range = (start.strftime(TIME_FORMAT), end.strftime(TIME_FORMAT))
+        return self._time_range
 
     # pylint: disable=too-many-locals
     @Throttle(MIN_TIME_BETWEEN_UPDATES)
     async def async_update(self):
         """Retrieve information from NWS api."""
-        latitude = None
-        longitude = None
-        if self._location:
-            latitude = self._location.get(CONF_LATITUDE, None)
-            longitude = self._location.get(CONF_LONGITUDE, None)
-        elif self._zone:
-            [latitude, longitude] = self._get_zone_lat_long()
-
+        latitude, longitude = self._get_coords()
         if not latitude or not longitude:
             return
 
+        query = self._hass.data[DOMAIN][DATA_SEVERITIES].get(self._query_id)
         params = _get_query_params(
-            self._severity,
+            query[1] if query else self._query_severity,
             self._message_type,
             latitude,
             longitude
         )
 
         if not self._active_only:
-            utc_offset = timedelta(
-                seconds=-(time.altzone if time.localtime().tm_isdst else time.timezone))
-            now = (datetime.now().replace(tzinfo=timezone(offset=utc_offset)) - timedelta(hours=5))
-            start = datetime(year=now.year, month=now.month,
-                             day=now.day, hour=0, second=0,
-                             tzinfo=timezone(offset=utc_offset))
-            end = start + timedelta(days=self._forecast_days + 1)
-            params = _append_time_params(
-                params,
-                start.isoformat(),
-                end.isoformat()
-            )
-
-        url = NWS_API_ENDPOINT if not self._active_only else "%s/active" % NWS_API_ENDPOINT
-
-        websession = aiohttp.ClientSession()
+            start, end = self._get_time_range()
+            params = _append_time_params(params, start, end)
 
         try:
+            alerts = await _async_fetch_alerts(
+                self._hass, self._websession, self._url, params)
+            if alerts is None:
+                return
 
-            with async_timeout.timeout(10):
-                _LOGGER.warning("Retrieving alerts from %s with %s",
-                                url,
-                                str(params))
-                response = await websession.get(url, params=params, headers=_get_headers())
-
-                if response.status != 200:
-                    _LOGGER.warning("Error %d getting nws alerts.", response.status)
-                    return
-
-                json = await response.json()
-
-                self._state = None
-                self._updates = {}
-                for feature in json.get('features', []):
-                    update = feature.get('properties', {}).get('headline', None)
-                    sent = feature.get('properties', {}).get('sent', None)
-                    if update and sent:
-                        if not self._state:
-                            self._state = update
-                        self._updates[sent] = update
-
-                self._state = self._state or ' '
+            self._updates = {sent: update for sent, update, severity in alerts
+                             if severity in self._severity}
+            self._state = next(iter(self._updates.values()), ' ')
 
         except asyncio.TimeoutError:
             _LOGGER.error("Timeout updating %s",
                           self.entity_id)
-        except aiohttp.ClientError as err:
+        except (aiohttp.ClientError, ijson.JSONError) as err:
             _LOGGER.error("Unable to update %s: %s",
                           self.entity_id,
-                          str(err))
-        finally:
-            await websession.close()
+                          err)